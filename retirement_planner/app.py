@@ -2,19 +2,18 @@ from __future__ import annotations
 
 import sys
 import os
-
-# Add parent directory to path for Streamlit Cloud deployment
-# This ensures the retirement_planner package can be imported
-script_dir = os.path.dirname(os.path.abspath(__file__))
-parent_dir = os.path.dirname(script_dir)
-
-if parent_dir not in sys.path:
-    sys.path.insert(0, parent_dir)
+from dataclasses import astuple
 
 import streamlit as st
 import pandas as pd
 
-from retirement_planner.calculations import ProjectionConfig, run_projection
+try:
+    from retirement_planner.calculations import ProjectionConfig, run_projection
+except ImportError:
+    # Add parent directory to path for Streamlit Cloud deployment, where the
+    # package is not installed and only the script's own directory is on sys.path
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from retirement_planner.calculations import ProjectionConfig, run_projection
 
 
 def _default_config() -> ProjectionConfig:
@@ -73,52 +72,56 @@ def _build_sidebar(config: ProjectionConfig) -> ProjectionConfig:
     st.sidebar.subheader("Social Security")
     social_security_start_age = st.sidebar.slider("Social Security start age", min_value=62, max_value=70, value=config.social_security_start_age, step=1)
 
+    # Quantize floats (cents for dollars, hundredths of a percent for rates) so
+    # numerically equivalent inputs produce the same projection cache key
     return ProjectionConfig(
         current_age=int(current_age),
         retire_age=int(retire_age),
         end_age=int(end_age),
-        current_401k_balance=float(current_401k_balance),
-        current_brokerage_balance=float(current_brokerage_balance),
-        annual_401k_contribution=float(annual_401k_contribution),
-        annual_brokerage_contribution=float(annual_brokerage_contribution),
-        real_return_401k=float(real_return_401k),
-        real_return_brokerage=float(real_return_brokerage),
-        swr=float(swr),
+        current_401k_balance=round(float(current_401k_balance), 2),
+        current_brokerage_balance=round(float(current_brokerage_balance), 2),
+        annual_401k_contribution=round(float(annual_401k_contribution), 2),
+        annual_brokerage_contribution=round(float(annual_brokerage_contribution), 2),
+        real_return_401k=round(float(real_return_401k), 4),
+        real_return_brokerage=round(float(real_return_brokerage), 4),
+        swr=round(float(swr), 4),
         filing_status=filing_status,
-        state_tax_rate=float(state_tax_rate),
+        state_tax_rate=round(float(state_tax_rate), 4),
         withdrawal_order=withdrawal_order,
         social_security_start_age=int(social_security_start_age),
     )
 
 
+@st.cache_data(max_entries=32, ttl="1h")
+def _cached_run_projection(config_values: tuple) -> pd.DataFrame:
+    """Run the projection once per unique set of inputs.
+
+    Takes the config as a plain tuple so Streamlit can hash it.
+    """
+    return run_projection(ProjectionConfig(*config_values))
+
+
+_CURRENCY_FORMAT = "${:,.0f}"
+
+
 def _format_currency(value: float) -> str:
     """Format a float as USD currency without decimals."""
-    return f"${value:,.0f}"
+    return _CURRENCY_FORMAT.format(value)
 
 
 def _format_dataframe_currency(df: pd.DataFrame, currency_cols: list[str]) -> pd.DataFrame:
     """Format currency columns in a dataframe for display."""
-    df_formatted = df.copy()
+    # Non-currency columns are shared with the input rather than copied
+    columns = {col: df[col] for col in df.columns}
     for col in currency_cols:
-        if col in df_formatted.columns:
-            df_formatted[col] = df_formatted[col].apply(_format_currency)
-    return df_formatted
+        if col in columns:
+            columns[col] = columns[col].map(_CURRENCY_FORMAT.format)
+    return pd.DataFrame(columns, copy=False)
 
 
-def main() -> None:
-    st.set_page_config(page_title="Retirement Planner", layout="wide")
-    st.title("Retirement Planner")
-    st.markdown(
-        "Enter your information on the left to project your balances and retirement income. "
-        "This is a simplified model and not tax or investment advice."
-    )
-
-    base_config = _default_config()
-    config = _build_sidebar(base_config)
-
-    df = run_projection(config)
-
-    # Age selector slider in main window
+@st.fragment
+def _age_metrics(df: pd.DataFrame, config: ProjectionConfig) -> None:
+    """Age slider and headline metrics; reruns on its own when the slider moves."""
     st.markdown("### Select Age to View Projections")
     selected_age = st.slider(
         "Age",
@@ -129,8 +132,8 @@ def main() -> None:
         key="age_selector"
     )
     
-    # Get row for selected age
-    selected_row = df[df["age"] == selected_age].iloc[0]
+    # The projection is indexed by age
+    selected_row = df.loc[selected_age]
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -140,12 +143,30 @@ def main() -> None:
     with col3:
         st.metric("Annual income (after tax)", _format_currency(selected_row['net_income_after_tax']))
 
+
+def main() -> None:
+    st.set_page_config(page_title="Retirement Planner", layout="wide")
+    st.title("Retirement Planner")
+    st.markdown(
+        "Enter your information on the left to project your balances and retirement income. "
+        "This is a simplified model and not tax or investment advice."
+    )
+
+    base_config = _default_config()
+    config = _build_sidebar(base_config)
+
+    df = _cached_run_projection(astuple(config))
+
+    _age_metrics(df, config)
+
     st.markdown("### Portfolio balances by age")
-    balance_chart_df = df[["age", "balance_401k", "balance_brokerage", "total_balance"]].set_index("age")
+    balance_chart_df = df[["balance_401k", "balance_brokerage", "total_balance"]]
     st.line_chart(balance_chart_df)
 
     st.markdown("### Withdrawals and taxes (retirement years)")
-    retirement_df = df[df["is_retirement_year"]].copy()
+    # Retirement years are always the trailing rows of the projection
+    retire_start = max(0, config.retire_age - config.current_age)
+    retirement_df = df.iloc[retire_start:]
     if not retirement_df.empty:
         display_cols = [
             "age",
@@ -172,7 +193,7 @@ def main() -> None:
         st.dataframe(display_df_formatted)
 
         st.markdown("#### Annual withdrawal vs. after-tax income")
-        income_chart_df = retirement_df[["age", "withdrawal_total", "net_income_after_tax"]].set_index("age")
+        income_chart_df = retirement_df[["withdrawal_total", "net_income_after_tax"]]
         st.line_chart(income_chart_df)
     else:
         st.info("You have not reached retirement age within the planned horizon.")
@@ -192,7 +213,7 @@ def main() -> None:
         "state_tax",
     ]
     full_df_formatted = _format_dataframe_currency(df, full_currency_cols)
-    st.dataframe(full_df_formatted)
+    st.dataframe(full_df_formatted, hide_index=True)
 
 
 if __name__ == "__main__":
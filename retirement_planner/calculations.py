@@ -1,16 +1,37 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import List, Literal, Dict, Any
+from typing import Literal, Tuple
 
+import numpy as np
 import pandas as pd
 
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; the kernels run as plain Python without it
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+    prange = range
+
 # Use relative import for better compatibility with Streamlit Cloud
-from .taxes import TaxInput, TaxResult, compute_taxes, estimate_brokerage_gains
+from .taxes import TaxInput, compute_taxes, estimate_brokerage_gains
 
 
 WithdrawalOrder = Literal["brokerage_first", "tax_deferred_first"]
 
+# Base Social Security benefit at age 62 is ~$41,000/year
+# Benefits are reduced if started before full retirement age (67) and increased if delayed
+BASE_SS_AGE_62 = 41000.0
+FULL_RETIREMENT_AGE = 67
+SS_EARLY_REDUCTION_PER_YEAR = 0.055  # ~5.5% per year before full retirement age (up to 30% reduction at 62)
+SS_DELAYED_INCREASE_PER_YEAR = 0.08  # ~8% per year after full retirement age (up to age 70)
+SS_MAX_DELAY_YEARS = 3  # Max delay to 70
+# Apply COLA (Cost of Living Adjustment) - typically 2-3% per year
+SOCIAL_SECURITY_COLA = 0.025  # 2.5% annual COLA adjustment
+
 
 @dataclass
 class ProjectionConfig:
@@ -35,146 +56,256 @@ class ProjectionConfig:
     social_security_start_age: int = 62
 
 
-def _year_sequence(config: ProjectionConfig) -> List[int]:
-    return list(range(config.current_age, config.end_age + 1))
+def _year_sequence(config: ProjectionConfig) -> np.ndarray:
+    return np.arange(config.current_age, config.end_age + 1)
+
+
+def _social_security_base_benefit(start_age: int) -> float:
+    """First-year benefit, adjusted for claiming before or after full retirement age."""
+    if start_age < FULL_RETIREMENT_AGE:
+        years_early = FULL_RETIREMENT_AGE - start_age
+        return BASE_SS_AGE_62 * (1 - (SS_EARLY_REDUCTION_PER_YEAR * years_early))
+    if start_age > FULL_RETIREMENT_AGE:
+        years_delayed = min(start_age - FULL_RETIREMENT_AGE, SS_MAX_DELAY_YEARS)
+        return BASE_SS_AGE_62 * (1 + (SS_DELAYED_INCREASE_PER_YEAR * years_delayed))
+    return BASE_SS_AGE_62
+
+
+def _accumulate(balance: float, contribution: float, growth: float, n_years: int) -> np.ndarray:
+    """End-of-year balances for the contribution phase (contribute, then grow).
+
+    Closed form after k years: B*g^k + C*g*(g^k - 1)/(g - 1), or B + C*k when g == 1.
+    """
+    years = np.arange(1, n_years + 1)
+    factors = np.power(growth, years)
+    if growth == 1:
+        return balance + contribution * years
+    return balance * factors + contribution * growth * (factors - 1) / (growth - 1)
+
+
+@njit(cache=True)
+def _deplete(
+    balance_401k: float,
+    balance_brokerage: float,
+    growth_401k: np.ndarray,
+    growth_brokerage: np.ndarray,
+    swr: float,
+    brokerage_first: bool,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Grow, then withdraw, year by year during retirement.
+
+    growth_* hold one growth factor per retirement year. Each withdrawal depends on the
+    previous year's balances, so this phase stays sequential.
+    """
+    n_years = len(growth_401k)
+
+    # Withdraw from the primary account first. Roles are assigned once up front so
+    # the yearly update is a single arithmetic path.
+    if brokerage_first:
+        primary, secondary = balance_brokerage, balance_401k
+        growth_primary, growth_secondary = growth_brokerage, growth_401k
+    else:
+        primary, secondary = balance_401k, balance_brokerage
+        growth_primary, growth_secondary = growth_401k, growth_brokerage
+
+    out_primary = np.empty(n_years)
+    out_secondary = np.empty(n_years)
+    out_total = np.empty(n_years)
+    out_from_primary = np.empty(n_years)
+    out_from_secondary = np.empty(n_years)
+
+    for i in range(n_years):
+        post_growth_primary = primary * growth_primary[i]
+        post_growth_secondary = secondary * growth_secondary[i]
+
+        # Calculate withdrawal as percentage of current year's portfolio balance
+        withdrawal_total = (post_growth_primary + post_growth_secondary) * swr
+
+        from_primary = min(withdrawal_total, post_growth_primary)
+        from_secondary = withdrawal_total - from_primary
+
+        primary = post_growth_primary - from_primary
+        secondary = post_growth_secondary - from_secondary
+
+        out_primary[i] = primary
+        out_secondary[i] = secondary
+        out_total[i] = withdrawal_total
+        out_from_primary[i] = from_primary
+        out_from_secondary[i] = from_secondary
+
+    if brokerage_first:
+        return out_secondary, out_primary, out_total, out_from_secondary, out_from_primary
+    return out_primary, out_secondary, out_total, out_from_primary, out_from_secondary
+
+
+@njit(parallel=True, cache=True)
+def _simulate_total_balances(
+    balance_401k: float,
+    balance_brokerage: float,
+    contribution_401k: float,
+    contribution_brokerage: float,
+    growth_401k: np.ndarray,
+    growth_brokerage: np.ndarray,
+    n_working: int,
+    swr: float,
+    brokerage_first: bool,
+) -> np.ndarray:
+    """Total balance paths for a (n_sims, n_years) matrix of growth factors, one path per row."""
+    n_sims, n_years = growth_401k.shape
+    total_balance = np.empty((n_sims, n_years))
+
+    for s in prange(n_sims):
+        # Returns vary by year, so the contribution phase is a forward recurrence
+        path_401k = balance_401k
+        path_brokerage = balance_brokerage
+        for i in range(n_working):
+            path_401k = (path_401k + contribution_401k) * growth_401k[s, i]
+            path_brokerage = (path_brokerage + contribution_brokerage) * growth_brokerage[s, i]
+            total_balance[s, i] = path_401k + path_brokerage
+
+        retired_401k, retired_brokerage, _, _, _ = _deplete(
+            path_401k,
+            path_brokerage,
+            growth_401k[s, n_working:],
+            growth_brokerage[s, n_working:],
+            swr,
+            brokerage_first,
+        )
+        total_balance[s, n_working:] = retired_401k + retired_brokerage
+
+    return total_balance
 
 
 def run_projection(config: ProjectionConfig) -> pd.DataFrame:
-    years = _year_sequence(config)
-
-    balance_401k = config.current_401k_balance
-    balance_brokerage = config.current_brokerage_balance
-
-    rows: List[Dict[str, Any]] = []
-
-    for age in years:
-        year_index = age - config.current_age
-
-        is_retirement_year = age >= config.retire_age
-
-        pre_growth_401k = balance_401k
-        pre_growth_brokerage = balance_brokerage
-
-        if not is_retirement_year:
-            pre_growth_401k += config.annual_401k_contribution
-            pre_growth_brokerage += config.annual_brokerage_contribution
-
-        post_growth_401k = pre_growth_401k * (1 + config.real_return_401k)
-        post_growth_brokerage = pre_growth_brokerage * (1 + config.real_return_brokerage)
-
-        withdrawal_total = 0.0
-        withdrawal_401k = 0.0
-        withdrawal_brokerage = 0.0
-        
-        # Social Security starts at user-selected age, maximum benefit varies by starting age
-        # Only applies during retirement years
-        # Apply COLA (Cost of Living Adjustment) - typically 2-3% per year
-        SOCIAL_SECURITY_COLA = 0.025  # 2.5% annual COLA adjustment
-        
-        # Base Social Security benefit at age 62 is ~$41,000/year
-        # Benefits are reduced if started before full retirement age (67) and increased if delayed
-        BASE_SS_AGE_62 = 41000.0
-        FULL_RETIREMENT_AGE = 67
-        
-        if is_retirement_year and age >= config.social_security_start_age:
-            # Adjust base benefit based on starting age
-            if config.social_security_start_age < FULL_RETIREMENT_AGE:
-                # Reduce by ~5.5% per year before full retirement age (up to 30% reduction at 62)
-                reduction_per_year = 0.055
-                years_early = FULL_RETIREMENT_AGE - config.social_security_start_age
-                base_benefit = BASE_SS_AGE_62 * (1 - (reduction_per_year * years_early))
-            elif config.social_security_start_age > FULL_RETIREMENT_AGE:
-                # Increase by ~8% per year after full retirement age (up to age 70)
-                increase_per_year = 0.08
-                years_delayed = min(config.social_security_start_age - FULL_RETIREMENT_AGE, 3)  # Max delay to 70
-                base_benefit = BASE_SS_AGE_62 * (1 + (increase_per_year * years_delayed))
-            else:
-                # Full retirement age - use base amount
-                base_benefit = BASE_SS_AGE_62
-            
-            # Calculate years since starting age for COLA compounding
-            years_since_start = age - config.social_security_start_age
-            social_security_income = base_benefit * ((1 + SOCIAL_SECURITY_COLA) ** years_since_start)
-        else:
-            social_security_income = 0.0
-
-        tax_input: TaxInput | None = None
-        tax_result: TaxResult | None = None
-
-        if is_retirement_year:
-            # Calculate withdrawal as percentage of current year's portfolio balance
-            current_portfolio_balance = post_growth_401k + post_growth_brokerage
-            withdrawal_total = current_portfolio_balance * config.swr
-
-            if config.withdrawal_order == "brokerage_first":
-                from_brokerage = min(withdrawal_total, post_growth_brokerage)
-                from_401k = withdrawal_total - from_brokerage
-            else:
-                from_401k = min(withdrawal_total, post_growth_401k)
-                from_brokerage = withdrawal_total - from_401k
-
-            withdrawal_401k = from_401k
-            withdrawal_brokerage = from_brokerage
-
-            balance_401k = post_growth_401k - withdrawal_401k
-            balance_brokerage = post_growth_brokerage - withdrawal_brokerage
-
-            est_cap_gains = estimate_brokerage_gains(withdrawal_brokerage)
-
-            tax_input = TaxInput(
-                filing_status=config.filing_status,
-                state_rate=config.state_tax_rate,
-                ordinary_income=withdrawal_401k,
-                capital_gains_income=est_cap_gains,
-                social_security_income=social_security_income,
-            )
-            tax_result = compute_taxes(tax_input)
-        else:
-            balance_401k = post_growth_401k
-            balance_brokerage = post_growth_brokerage
-
-        total_balance = balance_401k + balance_brokerage
-
-        total_tax = tax_result.total_tax if tax_result else 0.0
-        # Net income includes both withdrawals and Social Security
-        total_income = withdrawal_total + social_security_income
-        net_income = total_income - total_tax
-
-        row: Dict[str, Any] = {
-            "age": age,
-            "year_index": year_index,
+    ages = _year_sequence(config)
+    n_years = len(ages)
+    n_working = min(max(config.retire_age - config.current_age, 0), n_years)
+    n_retired = n_years - n_working
+
+    is_retirement_year = ages >= config.retire_age
+
+    growth_401k = 1 + config.real_return_401k
+    growth_brokerage = 1 + config.real_return_brokerage
+
+    balance_401k = np.empty(n_years)
+    balance_brokerage = np.empty(n_years)
+    withdrawal_total = np.zeros(n_years)
+    withdrawal_401k = np.zeros(n_years)
+    withdrawal_brokerage = np.zeros(n_years)
+
+    balance_401k[:n_working] = _accumulate(
+        config.current_401k_balance, config.annual_401k_contribution, growth_401k, n_working
+    )
+    balance_brokerage[:n_working] = _accumulate(
+        config.current_brokerage_balance, config.annual_brokerage_contribution, growth_brokerage, n_working
+    )
+
+    start_401k = balance_401k[n_working - 1] if n_working else config.current_401k_balance
+    start_brokerage = balance_brokerage[n_working - 1] if n_working else config.current_brokerage_balance
+
+    (
+        balance_401k[n_working:],
+        balance_brokerage[n_working:],
+        withdrawal_total[n_working:],
+        withdrawal_401k[n_working:],
+        withdrawal_brokerage[n_working:],
+    ) = _deplete(
+        float(start_401k),
+        float(start_brokerage),
+        np.full(n_retired, growth_401k),
+        np.full(n_retired, growth_brokerage),
+        config.swr,
+        config.withdrawal_order == "brokerage_first",
+    )
+
+    # Social Security starts at user-selected age and only applies during retirement years
+    base_benefit = _social_security_base_benefit(config.social_security_start_age)
+
+    # COLA compounds from the starting age
+    receives_ss = is_retirement_year & (ages >= config.social_security_start_age)
+    years_since_start = np.maximum(ages - config.social_security_start_age, 0)
+    social_security_income = np.where(
+        receives_ss, base_benefit * (1 + SOCIAL_SECURITY_COLA) ** years_since_start, 0.0
+    )
+
+    tax_total = np.zeros(n_years)
+    tax_effective_rate = np.zeros(n_years)
+    federal_tax = np.zeros(n_years)
+    state_tax = np.zeros(n_years)
+
+    for i in range(n_working, n_years):
+        est_cap_gains = estimate_brokerage_gains(float(withdrawal_brokerage[i]))
+
+        tax_input = TaxInput(
+            filing_status=config.filing_status,
+            state_rate=config.state_tax_rate,
+            ordinary_income=float(withdrawal_401k[i]),
+            capital_gains_income=est_cap_gains,
+            social_security_income=float(social_security_income[i]),
+        )
+        tax_result = compute_taxes(tax_input)
+
+        tax_total[i] = tax_result.total_tax
+        tax_effective_rate[i] = tax_result.effective_rate
+        federal_tax[i] = tax_result.federal_tax
+        state_tax[i] = tax_result.state_tax
+
+    # Net income includes both withdrawals and Social Security
+    net_income_after_tax = withdrawal_total + social_security_income - tax_total
+
+    # Ages fit in int16; dollar and rate columns stay float64 for exact whole-dollar display
+    ages = ages.astype(np.int16)
+
+    # Indexed by age for charting; age is also kept as a regular column
+    df = pd.DataFrame(
+        {
+            "age": ages,
+            "year_index": np.arange(n_years, dtype=np.int16),
             "is_retirement_year": is_retirement_year,
             "balance_401k": balance_401k,
             "balance_brokerage": balance_brokerage,
-            "total_balance": total_balance,
+            "total_balance": balance_401k + balance_brokerage,
             "withdrawal_total": withdrawal_total,
             "withdrawal_401k": withdrawal_401k,
             "withdrawal_brokerage": withdrawal_brokerage,
             "social_security_income": social_security_income,
-            "tax_total": total_tax,
-            "net_income_after_tax": net_income,
-        }
-
-        if tax_result is not None:
-            row.update(
-                {
-                    "tax_effective_rate": tax_result.effective_rate,
-                    "federal_tax": tax_result.federal_tax,
-                    "state_tax": tax_result.state_tax,
-                }
-            )
-        else:
-            row.update(
-                {
-                    "tax_effective_rate": 0.0,
-                    "federal_tax": 0.0,
-                    "state_tax": 0.0,
-                }
-            )
-
-        rows.append(row)
-
-    df = pd.DataFrame(rows)
+            "tax_total": tax_total,
+            "net_income_after_tax": net_income_after_tax,
+            "tax_effective_rate": tax_effective_rate,
+            "federal_tax": federal_tax,
+            "state_tax": state_tax,
+        },
+        index=pd.Index(ages, name="age"),
+    )
     return df
 
 
+def run_simulations(
+    config: ProjectionConfig, returns_401k: np.ndarray, returns_brokerage: np.ndarray
+) -> np.ndarray:
+    """Total portfolio balance by age for many return scenarios (e.g. Monte Carlo).
+
+    returns_401k and returns_brokerage are real annual returns of shape (n_sims, n_years),
+    one column per age of the projection. Returns total balances of the same shape. Taxes
+    and Social Security don't change balances, so they are not modelled here; paths run in
+    parallel when numba is installed.
+    """
+    n_years = len(_year_sequence(config))
+    returns_401k = np.asarray(returns_401k, dtype=np.float64)
+    returns_brokerage = np.asarray(returns_brokerage, dtype=np.float64)
+    if returns_401k.ndim != 2 or returns_401k.shape[1] != n_years or returns_brokerage.shape != returns_401k.shape:
+        raise ValueError(f"Expected return matrices of shape (n_sims, {n_years})")
+
+    n_working = min(max(config.retire_age - config.current_age, 0), n_years)
+
+    return _simulate_total_balances(
+        float(config.current_401k_balance),
+        float(config.current_brokerage_balance),
+        float(config.annual_401k_contribution),
+        float(config.annual_brokerage_contribution),
+        1 + returns_401k,
+        1 + returns_brokerage,
+        n_working,
+        float(config.swr),
+        config.withdrawal_order == "brokerage_first",
+    )
@@ -3,8 +3,11 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
+import numpy as np
+
 
 OrdinaryBracket = Tuple[float, float]  # (threshold, rate)
+BracketTable = Tuple[np.ndarray, np.ndarray, np.ndarray]  # (thresholds, rates, tax owed at each threshold)
 
 
 FEDERAL_BRACKETS_SINGLE: List[OrdinaryBracket] = [
@@ -52,28 +55,25 @@ class TaxResult:
     capital_gains_taxed: float
 
 
-def _get_brackets(filing_status: str) -> List[OrdinaryBracket]:
-    if filing_status == "married":
-        return FEDERAL_BRACKETS_MARRIED
-    return FEDERAL_BRACKETS_SINGLE
+def _build_bracket_table(brackets: List[OrdinaryBracket]) -> BracketTable:
+    thresholds = np.array([threshold for threshold, _ in brackets])
+    rates = np.array([rate for _, rate in brackets])
+    cumulative_tax = np.concatenate(([0.0], np.cumsum(np.diff(thresholds) * rates[:-1])))
+    return thresholds, rates, cumulative_tax
 
 
-def _apply_ordinary_brackets(taxable_income: float, brackets: List[OrdinaryBracket]) -> float:
-    if taxable_income <= 0:
-        return 0.0
+_BRACKET_TABLES: Dict[str, BracketTable] = {
+    "single": _build_bracket_table(FEDERAL_BRACKETS_SINGLE),
+    "married": _build_bracket_table(FEDERAL_BRACKETS_MARRIED),
+}
 
-    tax = 0.0
-    for i, (threshold, rate) in enumerate(brackets):
-        if i + 1 < len(brackets):
-            next_threshold = brackets[i + 1][0]
-            amount_in_bracket = max(0.0, min(taxable_income, next_threshold) - threshold)
-        else:
-            amount_in_bracket = max(0.0, taxable_income - threshold)
 
-        if amount_in_bracket <= 0:
-            continue
-        tax += amount_in_bracket * rate
-    return tax
+def _apply_ordinary_brackets(taxable_income: float | np.ndarray, table: BracketTable) -> float | np.ndarray:
+    """Tax owed under the given brackets; works on a float or an array of incomes."""
+    thresholds, rates, cumulative_tax = table
+    income = np.maximum(taxable_income, 0.0)
+    idx = np.searchsorted(thresholds, income, side="right") - 1
+    return cumulative_tax[idx] + (income - thresholds[idx]) * rates[idx]
 
 
 def _calculate_taxable_social_security(ss_income: float, other_income: float, filing_status: str) -> float:
@@ -112,7 +112,7 @@ def _calculate_taxable_social_security(ss_income: float, other_income: float, fi
 
 def compute_taxes(ti: TaxInput) -> TaxResult:
     filing_status = ti.filing_status if ti.filing_status in ("single", "married") else "single"
-    brackets = _get_brackets(filing_status)
+    bracket_table = _BRACKET_TABLES[filing_status]
 
     std_deduction = STANDARD_DEDUCTION.get(filing_status, STANDARD_DEDUCTION["single"])
 
@@ -124,7 +124,7 @@ def compute_taxes(ti: TaxInput) -> TaxResult:
     total_ordinary_income = ti.ordinary_income + taxable_ss
     taxable_ordinary = max(0.0, total_ordinary_income - std_deduction)
 
-    federal_ordinary_tax = _apply_ordinary_brackets(taxable_ordinary, brackets)
+    federal_ordinary_tax = float(_apply_ordinary_brackets(taxable_ordinary, bracket_table))
 
     capital_gains_rate = 0.15
     federal_capital_tax = max(0.0, ti.capital_gains_income) * capital_gains_rate
@@ -8,6 +8,7 @@ setup(
     install_requires=[
         "streamlit>=1.39.0",
         "pandas>=2.2.0",
+        "numpy>=1.26.0",
         "altair>=5.2.0",
     ],
 )